@@ -1,6 +1,7 @@
 import pandas as pd
 from pandas.core.frame import DataFrame
 import os
+from typing import Dict, List
 
 COL_INVOICE_ID = "invoice_id"
 COL_LEGAL_ENTITY = "legal_entity"
@@ -14,6 +15,16 @@ COL_ARAP_VALUE_SUMS = "value_for_arap"
 COL_RATING = "rating"
 COL_STATUS = "status"
 COL_MAX_RATING_BY_COUNTERPARTY = "max_rating_by_counterparty"
+COL_ACCR_VALUE_SUMS_ERROR = f"{COL_ACCR_VALUE_SUMS}_error"
+COL_ARAP_VALUE_SUMS_ERROR = f"{COL_ARAP_VALUE_SUMS}_error"
+COL_APPROX_MAX_RATING_BY_COUNTERPARTY = f"approx_{COL_MAX_RATING_BY_COUNTERPARTY}"
+COL_EST_INVOICE_ROWS = "est_invoice_rows"
+COL_EST_INVOICE_ROWS_ERROR = f"{COL_EST_INVOICE_ROWS}_error"
+COL_SAMPLED_ROWS = "sampled_rows"
+COL_VALUE_P50 = "value_p50"
+COL_VALUE_P95 = "value_p95"
+COL_PERIOD = "period"
+COL_SCENARIO_ID = "scenario_id"
 
 STATUS_ACCR = "ACCR"
 STATUS_ARAP = "ARAP"
@@ -50,8 +61,18 @@ def load_dataset(input_file_path_1: str, input_file_path_2: str) -> DataFrame:
     :param input_file_path_2: the path to the CSV file containing the second dataset
     :return: the resulting dataframe that is the first one joined to the second one on the counter party
     """
-    df_1 = pd.read_csv(input_file_path_1).drop("invoice_id", axis=1)
-    df_2 = pd.read_csv(input_file_path_2)
+    return load_dataset_with_lookup(input_file_path_1, load_df(input_file_path_2))
+
+
+def load_dataset_with_lookup(input_file_path_1: str, df_2: DataFrame) -> DataFrame:
+    """
+    Loads the first input dataset and joins it to an already loaded second dataset (the tier lookup). Useful when the
+    same second dataset is shared across many runs, e.g. in batch mode.
+    :param input_file_path_1: the path to the CSV file containing the first dataset
+    :param df_2: the already loaded second dataset
+    :return: the resulting dataframe that is the first one joined to the second one on the counter party
+    """
+    df_1 = pd.read_csv(input_file_path_1).drop(COL_INVOICE_ID, axis=1)
 
     # Join the two datasets on the counter_party
     df_merged = df_1.merge(df_2, on=COL_COUNTER_PARTY, how="left")
@@ -99,3 +120,18 @@ def rename_file(input_dir: str, from_filename: str, to_filename: str) -> None:
     fromf = os.path.join(input_dir, from_filename)
     tof = os.path.join(input_dir, to_filename)
     os.rename(fromf, tof)
+
+
+def get_scenario_ids(input_file_paths: List[str]) -> Dict[str, str]:
+    """
+    Derives the scenario ID's from the names of the dataset1 input files, e.g. input/2023-04-28.csv -> 2023-04-28.
+    :param input_file_paths: the paths to the dataset1 CSV files, one per scenario
+    :return: the mapping of the scenario ID to the respective input file path
+    """
+    scenarios = {}
+    for input_file_path in input_file_paths:
+        scenario_id = os.path.splitext(os.path.basename(input_file_path))[0]
+        if scenario_id in scenarios:
+            raise ValueError(f"Duplicate scenario ID '{scenario_id}' for {input_file_path}")
+        scenarios[scenario_id] = input_file_path
+    return scenarios
@@ -0,0 +1,477 @@
+import argparse
+import io
+import json
+import os
+from functools import reduce
+from itertools import combinations
+from typing import List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from pandas.core.frame import DataFrame
+from pandas.core.series import Series
+
+from hartree_common import (
+    COL_LEGAL_ENTITY,
+    COL_COUNTER_PARTY,
+    COL_TIER,
+    COL_VALUE,
+    COL_ACCR_VALUE_SUMS,
+    COL_ARAP_VALUE_SUMS,
+    COL_ACCR_VALUE_SUMS_ERROR,
+    COL_ARAP_VALUE_SUMS_ERROR,
+    COL_APPROX_MAX_RATING_BY_COUNTERPARTY,
+    COL_EST_INVOICE_ROWS,
+    COL_EST_INVOICE_ROWS_ERROR,
+    COL_RATING,
+    COL_SAMPLED_ROWS,
+    COL_STATUS,
+    COL_VALUE_P50,
+    COL_VALUE_P95,
+    STATUS_ACCR,
+    STATUS_ARAP,
+    load_df
+)
+from hartree_sketches import QuantileSketch, SampledSum, SampleDesign
+
+INPUT_FILE_1_PATH = "input/dataset1.csv"
+INPUT_FILE_2_PATH = "input/dataset2.csv"
+OUTPUT_FILE_PATH = "pandas_results/part_1_result_approx.csv"
+OUTPUT_CUBE_FILE_PATH = "pandas_results/part_2_result_cube_approx.csv"
+
+EXPECTED_RESULTS_FILE_PATH = "expected/expected_part_1_result.csv"
+
+COLS_TO_CUBE = [
+    COL_LEGAL_ENTITY,
+    COL_COUNTER_PARTY,
+    COL_TIER
+]
+
+COL_VALUE_SKETCH = "value_sketch"
+COL_ROWS_SAMPLED_SUM = "rows_sampled_sum"
+COL_ARAP_SAMPLED_SUM = "arap_sampled_sum"
+COL_ACCR_SAMPLED_SUM = "accr_sampled_sum"
+COL_SAMPLE_BLOCK = "sample_block"
+COL_SAMPLE_WEIGHT = "sample_weight"
+
+SKETCH_COLS = [COL_VALUE_SKETCH, COL_ROWS_SAMPLED_SUM, COL_ARAP_SAMPLED_SUM, COL_ACCR_SAMPLED_SUM]
+SKETCH_CLASSES = {
+    COL_VALUE_SKETCH: QuantileSketch,
+    COL_ROWS_SAMPLED_SUM: SampledSum,
+    COL_ARAP_SAMPLED_SUM: SampledSum,
+    COL_ACCR_SAMPLED_SUM: SampledSum,
+}
+CELL_COLS = COLS_TO_CUBE + [COL_APPROX_MAX_RATING_BY_COUNTERPARTY] + SKETCH_COLS
+
+# The estimated sums, their error bounds, and the sketch columns they are estimated from.
+ESTIMATED_COLS = [
+    (COL_ARAP_VALUE_SUMS, COL_ARAP_VALUE_SUMS_ERROR, COL_ARAP_SAMPLED_SUM),
+    (COL_ACCR_VALUE_SUMS, COL_ACCR_VALUE_SUMS_ERROR, COL_ACCR_SAMPLED_SUM),
+    (COL_EST_INVOICE_ROWS, COL_EST_INVOICE_ROWS_ERROR, COL_ROWS_SAMPLED_SUM),
+]
+
+OUTPUT_COL_ORDER = [COL_LEGAL_ENTITY, COL_COUNTER_PARTY, COL_TIER, COL_APPROX_MAX_RATING_BY_COUNTERPARTY,
+                    COL_ARAP_VALUE_SUMS, COL_ARAP_VALUE_SUMS_ERROR, COL_ACCR_VALUE_SUMS, COL_ACCR_VALUE_SUMS_ERROR,
+                    COL_EST_INVOICE_ROWS, COL_EST_INVOICE_ROWS_ERROR, COL_SAMPLED_ROWS, COL_VALUE_P50, COL_VALUE_P95]
+
+DEFAULT_SAMPLE_FRACTION = 0.01
+DEFAULT_SEED = 0
+# The sampling unit: the input file is sampled in blocks of this size so that the rest of it is never read.
+SAMPLE_BLOCK_BYTES = 1 << 14
+# The blocks are stratified by their position in the file, and this many blocks are sampled out of each stratum.
+# Two would do for the variance estimate to be unbiased, but on a sorted input, a stratum where a cell's rows end
+# would then too often get both its blocks from the same side, and look like it had no variance.
+SAMPLED_BLOCKS_PER_STRATUM = 16
+# Inputs are sampled at a higher rate (small ones in full) so that at least this many blocks get sampled.
+MIN_SAMPLE_BLOCKS = 200
+# How far to read ahead to find the end of the header row, or of the last row of a block.
+READ_AHEAD_BYTES = 1 << 16
+# The approximate results are rounded to 2 decimals.
+ROUNDING_TOLERANCE = 0.01
+
+
+def get_block_key(shard_id: str, index: int) -> str:
+    return f"{shard_id}:{index}"
+
+
+def choose_stratum_blocks(num_blocks: int, fraction: float) -> int:
+    """
+    Chooses the number of adjacent blocks per stratum: as many as makes for the requested sampling rate, but few
+    enough that at least MIN_SAMPLE_BLOCKS blocks get sampled.
+    :param num_blocks: the number of blocks in the input file
+    :param fraction: the requested sampling rate
+    :return: the number of blocks per stratum; at most SAMPLED_BLOCKS_PER_STRATUM when every block gets sampled
+    """
+    stratum_blocks = min(round(SAMPLED_BLOCKS_PER_STRATUM / fraction),
+                         SAMPLED_BLOCKS_PER_STRATUM * num_blocks // MIN_SAMPLE_BLOCKS)
+    return max(stratum_blocks, 1)
+
+
+def plan_sample(input_file_path: str, fraction: float, shard_id: str,
+                seed: Optional[int] = None) -> Tuple[SampleDesign, Optional[List[int]]]:
+    """
+    Plans a stratified block sample of the input file: the blocks of SAMPLE_BLOCK_BYTES bytes are split into strata
+    of adjacent blocks, and SAMPLED_BLOCKS_PER_STRATUM blocks of each stratum are sampled. Since the strata follow the
+    file order, the sample is spread across the whole file, e.g. across all the counterparties of a sorted file.
+    :param input_file_path: the path to the CSV file
+    :param fraction: the requested sampling rate
+    :param shard_id: the shard ID, which keys the strata and the blocks
+    :param seed: the random seed
+    :return: the sample design and the indexes of the sampled blocks, or None if the file is to be read in full
+    """
+    if fraction <= 0:
+        raise ValueError("The sampling rate has to be positive")
+    num_blocks = max(-(-os.path.getsize(input_file_path) // SAMPLE_BLOCK_BYTES), 1)
+    stratum_blocks = choose_stratum_blocks(num_blocks, fraction)
+    if stratum_blocks <= SAMPLED_BLOCKS_PER_STRATUM:
+        # Every block would be sampled anyway, so the file is read in full, as a single block.
+        block_key = get_block_key(shard_id, 0)
+        return SampleDesign({block_key: 1}, {block_key: block_key}), None
+
+    rng = np.random.default_rng(seed)
+    strata = {}
+    blocks = {}
+    sampled_blocks = []
+    for stratum, first_block in enumerate(range(0, num_blocks, stratum_blocks)):
+        stratum_key = get_block_key(shard_id, stratum)
+        stratum_size = min(stratum_blocks, num_blocks - first_block)
+        strata[stratum_key] = stratum_size
+        chosen = rng.choice(stratum_size, min(SAMPLED_BLOCKS_PER_STRATUM, stratum_size), replace=False)
+        for block in sorted((first_block + chosen).tolist()):
+            blocks[get_block_key(shard_id, block)] = stratum_key
+            sampled_blocks.append(block)
+    return SampleDesign(strata, blocks), sampled_blocks
+
+
+def read_sampled_blocks(input_file_path: str, sampled_blocks: List[int]) -> DataFrame:
+    """
+    Reads the sampled blocks of SAMPLE_BLOCK_BYTES bytes of the input CSV file, and only those. A row belongs to the
+    block in which it starts.
+    :param input_file_path: the path to the CSV file
+    :param sampled_blocks: the indexes of the sampled blocks
+    :return: the sampled rows, with the index of the block each one came from in an added column
+    """
+    file_size = os.path.getsize(input_file_path)
+
+    chunks = []
+    chunk_blocks = []
+    chunk_rows = []
+    with open(input_file_path, "rb") as file:
+        head = file.read(READ_AHEAD_BYTES)
+        # The line endings of the input files vary.
+        newline = b"\n" if b"\n" in head else b"\r"
+        header_end = head.index(newline) + 1
+        header = head[:header_end]
+
+        for block in sampled_blocks:
+            start = max(block * SAMPLE_BLOCK_BYTES, header_end)
+            end = min((block + 1) * SAMPLE_BLOCK_BYTES, file_size)
+            if start >= end:
+                continue
+            # Skip the tail of the row which started in the previous block.
+            file.seek(start - 1)
+            data = file.read(end - start + 1)
+            row_start = 1 if data[:1] == newline else data.find(newline) + 1
+            if row_start == 0:
+                continue
+            data = data[row_start:]
+            # Complete the last row, which may run into the next block.
+            if not data.endswith(newline):
+                data += file.readline() if newline == b"\n" else file.read(READ_AHEAD_BYTES).split(newline)[0]
+                if not data.endswith(newline):
+                    data += newline
+            if data == newline:
+                continue
+            chunks.append(data)
+            chunk_blocks.append(block)
+            chunk_rows.append(data.count(newline))
+
+    # All the sampled rows are parsed at once; the blank lines are kept, so that the rows line up with the blocks.
+    df = pd.read_csv(io.BytesIO(header + b"".join(chunks)), skip_blank_lines=False)
+    df[COL_SAMPLE_BLOCK] = np.repeat(np.array(chunk_blocks, dtype=np.int64), chunk_rows)
+    return df.dropna(how="all", subset=df.columns.drop(COL_SAMPLE_BLOCK)).reset_index(drop=True)
+
+
+def load_sampled_dataset(input_file_path_1: str, df_2: DataFrame, fraction: float, shard_id: str,
+                         seed: Optional[int] = None) -> Tuple[SampleDesign, DataFrame]:
+    """
+    Loads a stratified block sample of the first input dataset, reading only the sampled blocks of the file, and
+    joins it to the second dataset.
+    :param input_file_path_1: the path to the CSV file containing the first dataset
+    :param df_2: the already loaded second dataset
+    :param fraction: the requested sampling rate
+    :param shard_id: the shard ID, which keys the strata and the blocks
+    :param seed: the random seed
+    :return: the sample design, and the sampled, joined dataset with the key of the block each row came from
+    """
+    design, sampled_blocks = plan_sample(input_file_path_1, fraction, shard_id, seed)
+    if sampled_blocks is None:
+        df_1 = load_df(input_file_path_1).assign(**{COL_SAMPLE_BLOCK: get_block_key(shard_id, 0)})
+    else:
+        df_1 = read_sampled_blocks(input_file_path_1, sampled_blocks)
+        df_1[COL_SAMPLE_BLOCK] = shard_id + ":" + df_1[COL_SAMPLE_BLOCK].astype(str)
+
+    # Join the two datasets on the counter_party
+    return design, df_1.merge(df_2, on=COL_COUNTER_PARTY, how="left")
+
+
+def build_sketches(design: SampleDesign, df_sample: DataFrame) -> DataFrame:
+    """
+    Builds the mergeable sketches for each { legal_entity, counter_party, tier } cell out of a block sample of the
+    rows: the largest sampled rating, a quantile sketch of the values weighted by the sampling weights, and the
+    sampled block totals of the number of rows and of the ARAP and ACCR values, which the sums are estimated from.
+    :param design: the sample design
+    :param df_sample: the sampled, joined input dataset, including the sampled block keys
+    :return: the dataframe with one row of sketches per cell
+    """
+    df_sample = df_sample.assign(**{COL_SAMPLE_WEIGHT: design.block_weights(df_sample[COL_SAMPLE_BLOCK])})
+
+    rows = []
+    for keys, df_cell in df_sample.groupby(COLS_TO_CUBE, dropna=False):
+        df_arap = df_cell[df_cell[COL_STATUS] == STATUS_ARAP]
+        df_accr = df_cell[df_cell[COL_STATUS] == STATUS_ACCR]
+        rows.append([
+            *keys,
+            df_cell[COL_RATING].max(),
+            QuantileSketch().update(df_cell[COL_VALUE], df_cell[COL_SAMPLE_WEIGHT]),
+            SampledSum.from_sample(df_cell.groupby(COL_SAMPLE_BLOCK).size()),
+            SampledSum.from_sample(df_arap.groupby(COL_SAMPLE_BLOCK)[COL_VALUE].sum()),
+            SampledSum.from_sample(df_accr.groupby(COL_SAMPLE_BLOCK)[COL_VALUE].sum()),
+        ])
+
+    return pd.DataFrame(rows, columns=CELL_COLS)
+
+
+def build_empty_cells(keys: List[tuple]) -> DataFrame:
+    """
+    Builds the cells with empty sketches, i.e. with no sampled rows, for the given keys.
+    :param keys: the { legal_entity, counter_party, tier } keys
+    :return: the dataframe with one row of sketches per cell
+    """
+    return pd.DataFrame([[*key, np.nan] + [SKETCH_CLASSES[sketch_col]() for sketch_col in SKETCH_COLS]
+                         for key in keys], columns=CELL_COLS)
+
+
+def merge_all(sketches: Series):
+    """
+    Merges all the sketches in the series into one.
+    :param sketches: the sketches, all of the same kind
+    :return: the merged sketch
+    """
+    return reduce(lambda a, b: a.merge(b), sketches)
+
+
+def merge_cells(df_sketches: DataFrame, cols: List[str], rating_agg: str) -> DataFrame:
+    """
+    Merges the sketches of all the rows which share the values of the given columns.
+    :param df_sketches: the sketches dataframe
+    :param cols: the columns to group by
+    :param rating_agg: how to aggregate the max rating, e.g. "max" when merging shards
+    :return: the merged sketches dataframe
+    """
+    aggs = {COL_APPROX_MAX_RATING_BY_COUNTERPARTY: rating_agg}
+    aggs.update({sketch_col: merge_all for sketch_col in SKETCH_COLS})
+    return df_sketches.groupby(cols, dropna=False).agg(aggs).reset_index()
+
+
+def merge_shards(shards: List[Tuple[SampleDesign, DataFrame]]) -> Tuple[SampleDesign, DataFrame]:
+    """
+    Merges the sketches built over separate shards of dataset1 into one set of sketches. Each shard's blocks keep the
+    sampling weights of their own strata, so the shards may have been sampled at different rates.
+    :param shards: the sample design and the sketches dataframe of each shard
+    :return: the merged sample design and sketches dataframe
+    """
+    design = reduce(lambda a, b: a.merge(b), [shard_design for shard_design, _ in shards])
+    return design, merge_cells(pd.concat([df for _, df in shards]), COLS_TO_CUBE, "max")
+
+
+def to_json_value(value):
+    return value.item() if isinstance(value, np.generic) else value
+
+
+def save_sketches(design: SampleDesign, df_sketches: DataFrame, file_path: str) -> None:
+    """
+    Saves the sample design and the sketches as JSON, one object per cell, holding the raw state of each sketch.
+    :param design: the sample design
+    :param df_sketches: the sketches dataframe
+    :param file_path: the path to the JSON file
+    :return: None
+    """
+    cells = [
+        {col_name: value.to_dict() if col_name in SKETCH_COLS else to_json_value(value)
+         for col_name, value in record.items()}
+        for record in df_sketches.to_dict("records")
+    ]
+    with open(file_path, "w") as file:
+        json.dump({"design": design.to_dict(), "cells": cells}, file)
+
+
+def load_sketches(file_path: str) -> Tuple[SampleDesign, DataFrame]:
+    """
+    Loads the sample design and the sketches saved by save_sketches.
+    :param file_path: the path to the JSON file
+    :return: the sample design and the sketches dataframe
+    """
+    with open(file_path, "r") as file:
+        state = json.load(file)
+    cells = state["cells"]
+    for cell in cells:
+        for sketch_col in SKETCH_COLS:
+            cell[sketch_col] = SKETCH_CLASSES[sketch_col].from_dict(cell[sketch_col])
+    return SampleDesign.from_dict(state["design"]), pd.DataFrame(cells, columns=CELL_COLS)
+
+
+def find_unsampled_counterparties(df_sketches: DataFrame, df_2: DataFrame) -> DataFrame:
+    """
+    Finds the counterparties of the second dataset none of whose rows were sampled.
+    :param df_sketches: the sketches dataframe
+    :param df_2: the second dataset
+    :return: the rows of the second dataset for those counterparties
+    """
+    return df_2[~df_2[COL_COUNTER_PARTY].isin(df_sketches[COL_COUNTER_PARTY])]
+
+
+def warn_unsampled(design: SampleDesign, df_sketches: DataFrame, df_2: DataFrame) -> None:
+    """
+    Prints a warning for the counterparties, and for the ARAP and ACCR sums of the cells, without any sampled rows.
+    Their estimates are 0 and, unless the sample is complete, their error bounds are unknown.
+    :param design: the sample design
+    :param df_sketches: the sketches dataframe
+    :param df_2: the second dataset
+    :return: None
+    """
+    if design.is_complete:
+        return
+    df_unsampled = find_unsampled_counterparties(df_sketches, df_2)
+    if not df_unsampled.empty:
+        print(">> Warning: no rows sampled for counter_party {}; the cube reports them with no error bounds.".format(
+            ", ".join(df_unsampled[COL_COUNTER_PARTY].astype(str))))
+    for col_name, _, sketch_col in ESTIMATED_COLS[:2]:
+        num_unsampled = int((df_sketches[sketch_col].apply(lambda s: s.sample_blocks) == 0).sum())
+        if num_unsampled:
+            print(">> Warning: no rows sampled toward {} in {} of the {} cells; they have no error bounds.".format(
+                col_name, num_unsampled, len(df_sketches)))
+
+
+def summarize(design: SampleDesign, df_sketches: DataFrame) -> DataFrame:
+    """
+    Turns the sketches into the approximate results, with the 95% error bounds for the estimated sums. The max rating
+    is the largest sampled one, so a lower bound unless the sample is complete.
+    :param design: the sample design
+    :param df_sketches: the sketches dataframe
+    :return: the approximate results
+    """
+    df = df_sketches[COLS_TO_CUBE].copy()
+    df[COL_APPROX_MAX_RATING_BY_COUNTERPARTY] = df_sketches[COL_APPROX_MAX_RATING_BY_COUNTERPARTY].astype("Int64")
+    for col_name, error_col_name, sketch_col in ESTIMATED_COLS:
+        df[col_name] = df_sketches[sketch_col].apply(design.estimate).round(2)
+        df[error_col_name] = df_sketches[sketch_col].apply(design.error).round(2)
+    df[COL_SAMPLED_ROWS] = df_sketches[COL_ROWS_SAMPLED_SUM].apply(lambda s: s.sample_total).astype(int)
+    df[COL_VALUE_P50] = df_sketches[COL_VALUE_SKETCH].apply(lambda s: s.quantile(0.5)).round(2)
+    df[COL_VALUE_P95] = df_sketches[COL_VALUE_SKETCH].apply(lambda s: s.quantile(0.95)).round(2)
+    return df[OUTPUT_COL_ORDER]
+
+
+def generate_approx_cube(design: SampleDesign, df_sketches: DataFrame, df_2: DataFrame) -> DataFrame:
+    """
+    Generates the approximate 'cube' for legal_entity/counter_party/tier by merging the cell sketches, without going
+    back to the rows. Like the exact cube, only the groupings that include the tier are kept and the max ratings are
+    summed up across the merged cells. Unless the sample is complete, the counterparties (and tiers) of the second
+    dataset without any sampled rows are kept as well, with no error bounds, since the sample cannot tell whether
+    they have any invoices.
+    :param design: the sample design
+    :param df_sketches: the sketches dataframe
+    :param df_2: the second dataset
+    :return: the resulting approximate cube dataframe
+    """
+    dfs = []
+    for n in range(len(COLS_TO_CUBE), 0, -1):
+        for subset in combinations(COLS_TO_CUBE, n):
+            if COL_TIER in subset:
+                dfs.append(merge_cells(df_sketches, list(subset), "sum"))
+
+    if not design.is_complete:
+        df_unsampled = find_unsampled_counterparties(df_sketches, df_2)
+        keys = [("Total", counter_party, tier)
+                for counter_party, tier in zip(df_unsampled[COL_COUNTER_PARTY], df_unsampled[COL_TIER])]
+        keys += [("Total", "Total", tier)
+                 for tier in sorted(set(df_unsampled[COL_TIER]) - set(df_sketches[COL_TIER]))]
+        dfs.append(build_empty_cells(keys))
+
+    df_cube = summarize(design, pd.concat(dfs).fillna({COL_LEGAL_ENTITY: "Total", COL_COUNTER_PARTY: "Total"}))
+    # Like the exact cube, drop the rows with a null tier, i.e. the counterparties missing from dataset2.
+    df_cube = df_cube[df_cube[COL_TIER].notna()]
+    return df_cube.sort_values(COLS_TO_CUBE)
+
+
+def validate_approx(exp_results_file_path: str, actual_results_file_path: str) -> None:
+    """
+    Validates the approximate main results against the exact ones: the cells have to be the expected ones, and the
+    ARAP and ACCR value sums have to have error bounds and be within them of the exact sums.
+    :param exp_results_file_path: the path to the exact results CSV file
+    :param actual_results_file_path: the path to the approximate results CSV file
+    :return: None
+    """
+    df = load_df(actual_results_file_path).merge(load_df(exp_results_file_path), on=COLS_TO_CUBE, how="outer",
+                                                 suffixes=("", "_exact"), indicator=True)
+
+    assert (df["_merge"] != "right_only").all(), "Results are missing expected cells"
+    assert (df["_merge"] != "left_only").all(), "Results have unexpected cells"
+    for col_name, error_col_name, _ in ESTIMATED_COLS[:2]:
+        assert df[error_col_name].notna().all(), "Results have no error bounds"
+        deviations = (df[col_name] - df[f"{col_name}_exact"]).abs()
+        assert (deviations <= df[error_col_name] + ROUNDING_TOLERANCE).all(), "Results not within the error bounds"
+    print(">> Validation: OK.")
+
+
+if __name__ == "__main__":
+    """ This generates the approximate versions of the main output and of the cube, for fast previews. The exact
+    versions are generated by hartree_pandas_part_1_main and hartree_pandas_part_2_cube.
+    """
+    parser = argparse.ArgumentParser(description="Computes the approximate main output and cube from sketches.")
+    parser.add_argument("--input", default=INPUT_FILE_1_PATH, help="the dataset1 CSV file")
+    parser.add_argument("--dataset2", default=INPUT_FILE_2_PATH, help="the dataset2 CSV file")
+    parser.add_argument("--shard-id", default=None,
+                        help="the shard ID which keys the saved sketches; the input file name by default")
+    parser.add_argument("--sample-fraction", type=float, default=DEFAULT_SAMPLE_FRACTION,
+                        help="the fraction of dataset1 to read, raised so that at least {} blocks of it are "
+                             "read".format(MIN_SAMPLE_BLOCKS))
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED, help="the random seed for the sampling")
+    parser.add_argument("--sketch-files", nargs="+", default=None,
+                        help="previously saved per-shard sketches to merge instead of reading dataset1")
+    parser.add_argument("--save-sketches", default=None, help="where to save the sketches for later merges")
+    parser.add_argument("--expected", default=None,
+                        help="the exact main results to validate against; {} for the default input".format(
+                            EXPECTED_RESULTS_FILE_PATH))
+    args = parser.parse_args()
+
+    df_2 = load_df(args.dataset2)
+
+    if args.sketch_files:
+        design, df_sketches = merge_shards([load_sketches(file_path) for file_path in args.sketch_files])
+        print(">> Merged the sketches from {} shards.".format(len(args.sketch_files)))
+    else:
+        shard_id = args.shard_id or os.path.splitext(os.path.basename(args.input))[0]
+        design, df_sample = load_sampled_dataset(args.input, df_2, args.sample_fraction, shard_id, args.seed)
+        df_sketches = build_sketches(design, df_sample)
+    print(">> The sketches are built from a {:.2%} block sample of dataset1.".format(design.sample_fraction))
+    warn_unsampled(design, df_sketches, df_2)
+
+    if args.save_sketches:
+        save_sketches(design, df_sketches, args.save_sketches)
+        print(">> Saved sketches to {}".format(args.save_sketches))
+
+    summarize(design, df_sketches).sort_values([COL_LEGAL_ENTITY, COL_COUNTER_PARTY]).to_csv(OUTPUT_FILE_PATH,
+                                                                                             index=False)
+    print(">> Saved results to {}".format(OUTPUT_FILE_PATH))
+
+    generate_approx_cube(design, df_sketches, df_2).to_csv(OUTPUT_CUBE_FILE_PATH, index=False)
+    print(">> Saved results to {}".format(OUTPUT_CUBE_FILE_PATH))
+
+    expected_file_path = args.expected
+    if expected_file_path is None and not args.sketch_files and args.input == INPUT_FILE_1_PATH:
+        expected_file_path = EXPECTED_RESULTS_FILE_PATH
+    if expected_file_path:
+        validate_approx(expected_file_path, OUTPUT_FILE_PATH)
+
+    print(">> Done.")
@@ -0,0 +1,91 @@
+import argparse
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+from pandas.core.frame import DataFrame
+
+from hartree_common import get_scenario_ids, load_dataset_with_lookup, load_df
+import hartree_pandas_part_1_main as part_1
+import hartree_pandas_part_2_cube as part_2
+
+INPUT_FILE_2_PATH = "input/dataset2.csv"
+OUTPUT_DIR_PATH = "pandas_results_batch"
+OUTPUT_MAIN_FNAME = "part_1_result.csv"
+OUTPUT_CUBE_FNAME = "part_2_result_cube.csv"
+
+# The tier lookup, loaded once per worker process by init_worker.
+_df_lookup: Optional[DataFrame] = None
+
+
+def init_worker(df_lookup: DataFrame) -> None:
+    """
+    Initializes a worker process with the tier lookup so that it is shipped once per worker, not once per scenario.
+    :param df_lookup: the loaded second dataset
+    :return: None
+    """
+    global _df_lookup
+    _df_lookup = df_lookup
+
+
+def run_scenario(scenario_id: str, input_file_path: str, output_dir_path: str) -> Tuple[str, str]:
+    """
+    Computes and persists the main transformation and the cube for a single scenario.
+    :param scenario_id: the scenario ID
+    :param input_file_path: the path to the dataset1 CSV file for the scenario
+    :param output_dir_path: the batch output directory; the results go into its scenario ID subdirectory
+    :return: the paths to the persisted main and cube results
+    """
+    scenario_dir_path = os.path.join(output_dir_path, scenario_id)
+    os.makedirs(scenario_dir_path, exist_ok=True)
+
+    df = load_dataset_with_lookup(input_file_path, _df_lookup)
+    df_result = part_1.format_results(part_1.perform_transformations(df)).reset_index(drop=True)
+
+    main_file_path = os.path.join(scenario_dir_path, OUTPUT_MAIN_FNAME)
+    part_1.persist_results(df_result, main_file_path)
+
+    cube_file_path = os.path.join(scenario_dir_path, OUTPUT_CUBE_FNAME)
+    part_2.persist_results(part_2.generate_cube(df_result), cube_file_path)
+
+    return main_file_path, cube_file_path
+
+
+def run_batch(input_file_paths: List[str], input_file_2_path: str = INPUT_FILE_2_PATH,
+              output_dir_path: str = OUTPUT_DIR_PATH, max_workers: Optional[int] = None) -> Dict[str, Tuple[str, str]]:
+    """
+    Runs the main transformation and the cube for many dataset1 inputs (scenarios) in a pool of worker processes.
+    The second dataset is loaded only once per batch.
+    :param input_file_paths: the paths to the dataset1 CSV files, one per scenario
+    :param input_file_2_path: the path to the CSV file containing the second dataset
+    :param output_dir_path: the batch output directory
+    :param max_workers: the maximum number of worker processes; defaults to the number of CPU's
+    :return: the mapping of the scenario ID to the paths to its persisted main and cube results
+    """
+    scenarios = get_scenario_ids(input_file_paths)
+    df_lookup = load_df(input_file_2_path)
+
+    with ProcessPoolExecutor(max_workers=max_workers, initializer=init_worker, initargs=(df_lookup,)) as executor:
+        futures = {
+            scenario_id: executor.submit(run_scenario, scenario_id, input_file_path, output_dir_path)
+            for scenario_id, input_file_path in scenarios.items()
+        }
+        return {scenario_id: future.result() for scenario_id, future in futures.items()}
+
+
+if __name__ == "__main__":
+    """ This generates the main and cube output CSV files for each of the given dataset1 inputs, sharing dataset2
+    across all of them.
+    """
+    parser = argparse.ArgumentParser(description="Runs the main transformation and the cube for many scenarios.")
+    parser.add_argument("inputs", nargs="+", help="the dataset1 CSV files, one per scenario")
+    parser.add_argument("--dataset2", default=INPUT_FILE_2_PATH, help="the dataset2 CSV file")
+    parser.add_argument("--output-dir", default=OUTPUT_DIR_PATH, help="the batch output directory")
+    parser.add_argument("--workers", type=int, default=None, help="the number of worker processes")
+    args = parser.parse_args()
+
+    results = run_batch(args.inputs, args.dataset2, args.output_dir, args.workers)
+    for scenario_id, (main_file_path, cube_file_path) in results.items():
+        print(">> {}: saved results to {} and {}".format(scenario_id, main_file_path, cube_file_path))
+
+    print(">> Done.")
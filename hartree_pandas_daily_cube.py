@@ -0,0 +1,244 @@
+import argparse
+import os
+from typing import List, Optional, Tuple
+
+import pandas as pd
+from pandas.core.frame import DataFrame
+
+from hartree_common import (
+    COL_LEGAL_ENTITY,
+    COL_COUNTER_PARTY,
+    COL_TIER,
+    COL_ACCR_VALUE_SUMS,
+    COL_ARAP_VALUE_SUMS,
+    COL_MAX_RATING_BY_COUNTERPARTY,
+    COL_PERIOD,
+    get_scenario_ids,
+    load_dataset_with_lookup,
+    load_df
+)
+import hartree_pandas_part_1_main as part_1
+import hartree_pandas_part_2_cube as part_2
+
+INPUT_FILE_2_PATH = "input/dataset2.csv"
+STORE_DIR_PATH = "pandas_results_daily"
+CUBOIDS_SUBDIR = "cuboids"
+PREFIX_SUMS_SUBDIR = "prefix_sums"
+STORE_FILE_EXT = ".csv.gz"
+OUTPUT_MAIN_FNAME = "part_1_result.csv"
+OUTPUT_CUBE_FNAME = "part_2_result_cube.csv"
+
+KEY_COLS = [COL_LEGAL_ENTITY, COL_COUNTER_PARTY, COL_TIER]
+ADDITIVE_COLS = [COL_ARAP_VALUE_SUMS, COL_ACCR_VALUE_SUMS]
+
+DATE_FORMAT = "%Y-%m-%d"
+
+
+def to_business_date(value: str) -> str:
+    """
+    Normalizes a business date, e.g. 20230428 -> 2023-04-28, so that the stored dates sort chronologically.
+    :param value: the business date in any format understood by Pandas
+    :return: the normalized business date
+    """
+    return pd.Timestamp(value).strftime(DATE_FORMAT)
+
+
+def get_file_path(store_dir_path: str, subdir: str, business_date: str) -> str:
+    return os.path.join(store_dir_path, subdir, business_date + STORE_FILE_EXT)
+
+
+def list_business_dates(store_dir_path: str) -> List[str]:
+    """
+    Lists the business dates for which the daily cuboids have been stored.
+    :param store_dir_path: the store directory
+    :return: the sorted business dates
+    """
+    cuboids_dir_path = os.path.join(store_dir_path, CUBOIDS_SUBDIR)
+    if not os.path.isdir(cuboids_dir_path):
+        return []
+    return sorted(file_name[:-len(STORE_FILE_EXT)] for file_name in os.listdir(cuboids_dir_path)
+                  if file_name.endswith(STORE_FILE_EXT))
+
+
+def read_partial(store_dir_path: str, subdir: str, business_date: str) -> DataFrame:
+    return pd.read_csv(get_file_path(store_dir_path, subdir, business_date))
+
+
+def write_partial(df: DataFrame, store_dir_path: str, subdir: str, business_date: str) -> None:
+    os.makedirs(os.path.join(store_dir_path, subdir), exist_ok=True)
+    df.to_csv(get_file_path(store_dir_path, subdir, business_date), index=False)
+
+
+def add_partials(df_a: DataFrame, df_b: DataFrame) -> DataFrame:
+    """
+    Adds up the additive measures of the two partials, cell by cell.
+    :param df_a: the first partial
+    :param df_b: the second partial
+    :return: the resulting partial, which has the cells of both
+    """
+    df = pd.concat([df_a[KEY_COLS + ADDITIVE_COLS], df_b[KEY_COLS + ADDITIVE_COLS]])
+    # A counterparty missing from dataset2 has a null tier; its cell is kept, like the exact results do.
+    return df.groupby(KEY_COLS, as_index=False, dropna=False)[ADDITIVE_COLS].sum()
+
+
+def store_day(df_cuboid: DataFrame, business_date: str, store_dir_path: str = STORE_DIR_PATH) -> None:
+    """
+    Persists the cuboid for one business date and brings the prefix sums up to date. Appending the latest date only
+    writes its own prefix sums; backfilling an earlier date rewrites the prefix sums of the dates after it.
+    :param df_cuboid: the main transformation results for the business date
+    :param business_date: the business date
+    :param store_dir_path: the store directory
+    :return: None
+    """
+    business_date = to_business_date(business_date)
+    write_partial(df_cuboid, store_dir_path, CUBOIDS_SUBDIR, business_date)
+
+    business_dates = list_business_dates(store_dir_path)
+    earlier_dates = [d for d in business_dates if d < business_date]
+    df_prefix = (
+        read_partial(store_dir_path, PREFIX_SUMS_SUBDIR, earlier_dates[-1]) if earlier_dates
+        else pd.DataFrame(columns=KEY_COLS + ADDITIVE_COLS)
+    )
+    for d in business_dates[len(earlier_dates):]:
+        df_prefix = add_partials(df_prefix, read_partial(store_dir_path, CUBOIDS_SUBDIR, d))
+        write_partial(df_prefix, store_dir_path, PREFIX_SUMS_SUBDIR, d)
+
+
+def ingest(input_file_paths: List[str], input_file_2_path: str = INPUT_FILE_2_PATH,
+           store_dir_path: str = STORE_DIR_PATH) -> List[str]:
+    """
+    Computes and stores the daily cuboids for the given dataset1 inputs, one per business date. The business date is
+    taken from the input file name, e.g. input/2023-04-28.csv.
+    :param input_file_paths: the paths to the dataset1 CSV files, one per business date
+    :param input_file_2_path: the path to the CSV file containing the second dataset
+    :param store_dir_path: the store directory
+    :return: the ingested business dates
+    """
+    # The file names are checked for duplicates once normalized, e.g. 20230428.csv and 2023-04-28.csv are the same
+    # business date, and would otherwise overwrite each other's cuboid.
+    days = {}
+    for file_name, input_file_path in get_scenario_ids(input_file_paths).items():
+        business_date = to_business_date(file_name)
+        if business_date in days:
+            raise ValueError(f"Duplicate business date {business_date} for {days[business_date]} and "
+                             f"{input_file_path}")
+        days[business_date] = input_file_path
+
+    df_lookup = load_df(input_file_2_path)
+    for business_date, input_file_path in sorted(days.items()):
+        df = load_dataset_with_lookup(input_file_path, df_lookup)
+        df_cuboid = part_1.format_results(part_1.perform_transformations(df))
+        store_day(df_cuboid, business_date, store_dir_path)
+    return sorted(days)
+
+
+def query_range(start_date: str, end_date: str, store_dir_path: str = STORE_DIR_PATH) -> DataFrame:
+    """
+    Computes the main transformation results over a range of business dates out of the stored partials, without
+    going back to the invoices. The value sums are the difference of two prefix sums; the max ratings, which are not
+    additive, are merged from the daily cuboids within the range.
+    :param start_date: the first business date of the range, inclusive
+    :param end_date: the last business date of the range, inclusive
+    :param store_dir_path: the store directory
+    :return: the results, in the same format as the output of hartree_pandas_part_1_main
+    """
+    start_date = to_business_date(start_date)
+    end_date = to_business_date(end_date)
+    business_dates = list_business_dates(store_dir_path)
+    range_dates = [d for d in business_dates if start_date <= d <= end_date]
+    if not range_dates:
+        return pd.DataFrame(columns=part_1.OUTPUT_COL_ORDER)
+    earlier_dates = [d for d in business_dates if d < start_date]
+
+    df_ratings = (
+        pd.concat([read_partial(store_dir_path, CUBOIDS_SUBDIR, d) for d in range_dates])
+            .groupby(KEY_COLS, as_index=False, dropna=False)[COL_MAX_RATING_BY_COUNTERPARTY].max()
+    )
+
+    df_sums = read_partial(store_dir_path, PREFIX_SUMS_SUBDIR, range_dates[-1])
+    if earlier_dates:
+        df_before = read_partial(store_dir_path, PREFIX_SUMS_SUBDIR, earlier_dates[-1])
+        df_before[ADDITIVE_COLS] = -df_before[ADDITIVE_COLS]
+        df_sums = add_partials(df_sums, df_before)
+
+    # Only the cells with invoices within the range are kept.
+    df_result = df_ratings.merge(df_sums, on=KEY_COLS, how="left")
+    return part_1.format_results(df_result).reset_index(drop=True)
+
+
+def query_periods(start_date: str, end_date: str, freq: str,
+                  store_dir_path: str = STORE_DIR_PATH) -> Tuple[DataFrame, DataFrame]:
+    """
+    Computes the main transformation results and the cube for each period within a range of business dates.
+    :param start_date: the first business date of the range, inclusive
+    :param end_date: the last business date of the range, inclusive
+    :param freq: the period frequency, e.g. "W" or "M"
+    :param store_dir_path: the store directory
+    :return: the main results and the cube, with the period as the leading column
+    """
+    dfs_main = []
+    dfs_cube = []
+    for period in pd.period_range(start_date, end_date, freq=freq):
+        period_start = max(period.start_time, pd.Timestamp(start_date))
+        period_end = min(period.end_time, pd.Timestamp(end_date))
+        df_main = query_range(str(period_start), str(period_end), store_dir_path)
+        if df_main.empty:
+            continue
+        df_cube = part_2.generate_cube(df_main)
+        df_main.insert(0, COL_PERIOD, str(period))
+        df_cube.insert(0, COL_PERIOD, str(period))
+        dfs_main.append(df_main)
+        dfs_cube.append(df_cube)
+
+    if not dfs_main:
+        df_empty = pd.DataFrame(columns=[COL_PERIOD] + part_1.OUTPUT_COL_ORDER)
+        return df_empty, df_empty
+    return pd.concat(dfs_main), pd.concat(dfs_cube).sort_values([COL_PERIOD] + KEY_COLS)
+
+
+def persist_results(df_main: DataFrame, df_cube: DataFrame, output_dir_path: str) -> None:
+    os.makedirs(output_dir_path, exist_ok=True)
+    df_main.to_csv(os.path.join(output_dir_path, OUTPUT_MAIN_FNAME), index=False)
+    df_cube.to_csv(os.path.join(output_dir_path, OUTPUT_CUBE_FNAME), index=False)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """
+    This either stores the daily cuboids for the given dataset1 inputs, or generates the main and cube output CSV
+    files over a range of business dates out of the stored daily cuboids.
+    :param argv: the command line arguments
+    :return: None
+    """
+    parser = argparse.ArgumentParser(description="Stores daily cuboids and answers business date range queries.")
+    parser.add_argument("--store-dir", default=STORE_DIR_PATH, help="the daily cuboids store directory")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    ingest_parser = subparsers.add_parser("ingest", help="store the daily cuboids")
+    ingest_parser.add_argument("inputs", nargs="+", help="the dataset1 CSV files, named by their business date")
+    ingest_parser.add_argument("--dataset2", default=INPUT_FILE_2_PATH, help="the dataset2 CSV file")
+
+    query_parser = subparsers.add_parser("query", help="compute the results over a range of business dates")
+    query_parser.add_argument("--start", required=True, help="the first business date, inclusive")
+    query_parser.add_argument("--end", required=True, help="the last business date, inclusive")
+    query_parser.add_argument("--freq", default=None, help="break the range down into periods, e.g. W or M")
+    query_parser.add_argument("--output-dir", required=True, help="where to save the results")
+
+    args = parser.parse_args(argv)
+
+    if args.command == "ingest":
+        business_dates = ingest(args.inputs, args.dataset2, args.store_dir)
+        print(">> Stored the daily cuboids for {}".format(", ".join(business_dates)))
+    else:
+        if args.freq:
+            df_main, df_cube = query_periods(args.start, args.end, args.freq, args.store_dir)
+        else:
+            df_main = query_range(args.start, args.end, args.store_dir)
+            df_cube = part_2.generate_cube(df_main).sort_values(KEY_COLS) if not df_main.empty else df_main
+        persist_results(df_main, df_cube, args.output_dir)
+        print(">> Saved results to {}".format(args.output_dir))
+
+    print(">> Done.")
+
+
+if __name__ == "__main__":
+    main()
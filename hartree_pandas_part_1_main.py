@@ -156,15 +156,24 @@ def compute_value_sums(df: DataFrame, status: str, new_col_name: str) -> DataFra
     return df
 
 
-def persist_results(df: DataFrame) -> None:
+def format_results(df: DataFrame) -> DataFrame:
+    """
+    Puts the computed resulting dataframe into the output column order and sorts it.
+    :param df: the input resulting dataframe
+    :return: the formatted dataframe
+    """
+    df = df[OUTPUT_COL_ORDER]
+    return df.sort_values([COL_LEGAL_ENTITY, COL_COUNTER_PARTY])
+
+
+def persist_results(df: DataFrame, output_file_path: str = OUTPUT_FILE_PATH) -> None:
     """
     Persists the computed resulting dataframe into an output CSV file.
     :param df: the input resulting dataframe
+    :param output_file_path: the path to the output CSV file
     :return: none
     """
-    df = df[OUTPUT_COL_ORDER]
-    df = df.sort_values([COL_LEGAL_ENTITY, COL_COUNTER_PARTY])
-    df.to_csv(OUTPUT_FILE_PATH, index=False)
+    format_results(df).to_csv(output_file_path, index=False)
 
 
 if __name__ == "__main__":
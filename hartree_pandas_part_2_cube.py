@@ -47,25 +47,12 @@ def cube_sum(df_in: DataFrame, cols: List[str]) -> DataFrame:
     return pd.concat(dfs)
 
 
-def persist_results(df_in: DataFrame) -> None:
+def generate_cube(df: DataFrame) -> DataFrame:
     """
-    Persists the computed resulting dataframe into an output CSV file.
-    :param df_in: the input resulting dataframe
-    :return: none
-    """
-    df_in = df_in.sort_values([COL_LEGAL_ENTITY, COL_COUNTER_PARTY, COL_TIER])
-    df_in.to_csv(OUTPUT_FILE_PATH, index=False)
-
-
-if __name__ == "__main__":
-    """ This generates the output CSV file which contains the 'cube' for legal_entity/counter_party/tier.
+    Generates the 'cube' for legal_entity/counter_party/tier out of the main transformation results.
+    :param df: the main transformation results (the output of hartree_pandas_part_1_main)
+    :return: the resulting cube dataframe
     """
-    set_df_debug()
-
-    df = load_df(INPUT_FILE_PATH)
-
-    print(">> Loaded the input dataset.")
-
     df_res = cube_sum(df, COLS_TO_CUBE)
 
     df_res[COL_LEGAL_ENTITY].fillna(value="Total", inplace=True)
@@ -85,6 +72,31 @@ if __name__ == "__main__":
 
     df_res = df_res.drop_duplicates()
 
+    return df_res
+
+
+def persist_results(df_in: DataFrame, output_file_path: str = OUTPUT_FILE_PATH) -> None:
+    """
+    Persists the computed resulting dataframe into an output CSV file.
+    :param df_in: the input resulting dataframe
+    :param output_file_path: the path to the output CSV file
+    :return: none
+    """
+    df_in = df_in.sort_values([COL_LEGAL_ENTITY, COL_COUNTER_PARTY, COL_TIER])
+    df_in.to_csv(output_file_path, index=False)
+
+
+if __name__ == "__main__":
+    """ This generates the output CSV file which contains the 'cube' for legal_entity/counter_party/tier.
+    """
+    set_df_debug()
+
+    df = load_df(INPUT_FILE_PATH)
+
+    print(">> Loaded the input dataset.")
+
+    df_res = generate_cube(df)
+
     persist_results(df_res)
     print(">> Saved results to {}".format(OUTPUT_FILE_PATH))
 
@@ -0,0 +1,146 @@
+import argparse
+import os
+from typing import List
+
+from pyspark.sql import DataFrame, SparkSession
+from pyspark.sql.functions import (
+    broadcast,
+    input_file_name,
+    regexp_extract,
+)
+
+from hartree_common import (
+    COL_LEGAL_ENTITY,
+    COL_COUNTER_PARTY,
+    COL_TIER,
+    COL_SCENARIO_ID,
+    find_first_file_with_ext,
+    get_scenario_ids,
+    remove_files_in_dir,
+    rename_file
+)
+import hartree_pyspark_part_1_main as part_1
+import hartree_pyspark_part_2_cube as part_2
+
+INPUT_FILE_2_PATH = "input/dataset2.csv"
+OUTPUT_DIR_PATH = "pyspark_results_batch"
+OUTPUT_MAIN_SUBDIR = "main"
+OUTPUT_CUBE_SUBDIR = "cube"
+
+# The scenario ID is the input file name without its extension, as in hartree_common.get_scenario_ids.
+SCENARIO_ID_PATTERN = r"([^/]+)\.[^./]+$"
+
+
+def load_batch_dataset(spark: SparkSession, input_file_paths: List[str], input_file_2_path: str) -> DataFrame:
+    """
+    Loads the dataset1 inputs of all the scenarios into a single dataframe keyed by the scenario ID, joined to the
+    second dataset which is loaded only once and broadcast into the join.
+    :param spark: the spark session
+    :param input_file_paths: the paths to the dataset1 CSV files, one per scenario
+    :param input_file_2_path: the path to the CSV file containing the second dataset
+    :return: the joined dataframe, with the scenario ID column added
+    """
+    # Fail early on two inputs which would end up with the same scenario ID.
+    scenarios = get_scenario_ids(input_file_paths)
+
+    df_lookup = broadcast(part_1.load_lookup_dataset(spark, input_file_2_path))
+
+    # A single read of all the inputs with the schema given, so that there is no schema inference job per input.
+    df_1 = (
+        spark.read.csv(list(scenarios.values()), schema=part_1.DATASET_1_SCHEMA, header=True)
+            .withColumn(COL_SCENARIO_ID, regexp_extract(input_file_name(), SCENARIO_ID_PATTERN, 1))
+    )
+    return part_1.join_lookup(df_1, df_lookup, [COL_SCENARIO_ID])
+
+
+def persist_results(df_result: DataFrame, sort_cols: List[str], output_dir_path: str, output_fname: str) -> None:
+    """
+    Persists the resulting DataFrame of all the scenarios in one write, as one CSV file per scenario under the
+    scenario_id=<scenario ID> subdirectories of the output directory.
+    :param df_result: the resulting dataframe, keyed by the scenario ID
+    :param sort_cols: the columns to sort each scenario's results by
+    :param output_dir_path: the output directory
+    :param output_fname: the name of each scenario's output CSV file
+    :return: none
+    """
+    # Put each scenario into a single partition, so that it is written out as a single CSV file.
+    # Include the header row.
+    # Overwrite if the previously generated output exists.
+    (
+        df_result
+            .repartition(COL_SCENARIO_ID)
+            .sortWithinPartitions([COL_SCENARIO_ID] + sort_cols)
+            .write
+            .partitionBy(COL_SCENARIO_ID)
+            .option("header", True)
+            .mode("overwrite")
+            .csv(output_dir_path)
+    )
+
+    for scenario_dir_name in os.listdir(output_dir_path):
+        scenario_dir_path = os.path.join(output_dir_path, scenario_dir_name)
+        if not os.path.isdir(scenario_dir_path):
+            continue
+
+        # Delete any .crc files generated alongside the CSV
+        remove_files_in_dir(scenario_dir_path, ".crc")
+
+        # Rename the output file to the specific name
+        generated_fname = find_first_file_with_ext(scenario_dir_path, ".csv")
+        rename_file(scenario_dir_path, generated_fname, output_fname)
+
+
+def run_batch(spark: SparkSession, input_file_paths: List[str], input_file_2_path: str = INPUT_FILE_2_PATH,
+              output_dir_path: str = OUTPUT_DIR_PATH) -> None:
+    """
+    Runs the main transformation and the cube for many dataset1 inputs (scenarios) as single spark jobs keyed by the
+    scenario ID, rather than one job per scenario.
+    :param spark: the spark session
+    :param input_file_paths: the paths to the dataset1 CSV files, one per scenario
+    :param input_file_2_path: the path to the CSV file containing the second dataset
+    :param output_dir_path: the batch output directory
+    :return: None
+    """
+    df_main = load_batch_dataset(spark, input_file_paths, input_file_2_path)
+
+    # Cached since both the main results and the cube are written out of it.
+    df_result = part_1.perform_transformations(df_main, [COL_SCENARIO_ID]).cache()
+    persist_results(df_result, [COL_LEGAL_ENTITY, COL_COUNTER_PARTY],
+                    os.path.join(output_dir_path, OUTPUT_MAIN_SUBDIR), part_1.OUTPUT_FNAME)
+
+    df_cube = part_2.generate_cube(df_result, part_2.COLS_TO_CUBE, [COL_SCENARIO_ID])
+    persist_results(df_cube, [COL_LEGAL_ENTITY, COL_COUNTER_PARTY, COL_TIER],
+                    os.path.join(output_dir_path, OUTPUT_CUBE_SUBDIR), part_2.OUTPUT_FNAME)
+
+    df_result.unpersist()
+
+
+def main() -> None:
+    """
+    This generates the main and cube output CSV files for each of the given dataset1 inputs using PySpark, paying
+    for the spark session start-up and the dataset2 loading once per batch.
+
+    :return: None
+    """
+    parser = argparse.ArgumentParser(description="Runs the main transformation and the cube for many scenarios.")
+    parser.add_argument("inputs", nargs="+", help="the dataset1 CSV files, one per scenario")
+    parser.add_argument("--dataset2", default=INPUT_FILE_2_PATH, help="the dataset2 CSV file")
+    parser.add_argument("--output-dir", default=OUTPUT_DIR_PATH, help="the batch output directory")
+    args = parser.parse_args()
+
+    spark = SparkSession.builder.appName("hartree_challenge").getOrCreate()
+
+    # When writing csv files, avoid generating the SUCCESS file
+    spark.conf.set("mapreduce.fileoutputcommitter.marksuccessfuljobs", "false")
+
+    print("\n>> Running...\n")
+
+    run_batch(spark, args.inputs, args.dataset2, args.output_dir)
+
+    print("\n>> Done.\n")
+
+    spark.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,14 @@
-from pyspark.sql import DataFrame, SparkSession
+from functools import reduce
+from typing import List, Optional
+
+from pyspark.sql import Column, DataFrame, SparkSession
 from pyspark.sql.functions import (
     col,
     lit,
     max as smax,
     sum as ssum,
 )
+from pyspark.sql.types import IntegerType, StringType, StructField, StructType
 
 from hartree_common import (
     COL_INVOICE_ID,
@@ -31,133 +35,228 @@ OUTPUT_FNAME = "part_1_result.csv"
 
 EXPECTED_RESULTS_FILE_PATH = "expected/expected_part_1_result.csv"
 
+DATASET_1_SCHEMA = StructType([
+    StructField(COL_INVOICE_ID, IntegerType()),
+    StructField(COL_LEGAL_ENTITY, StringType()),
+    StructField(COL_COUNTER_PARTY, StringType()),
+    StructField(COL_RATING, IntegerType()),
+    StructField(COL_STATUS, StringType()),
+    StructField(COL_VALUE, IntegerType()),
+])
+
 
-def load_main_dataset(spark: SparkSession) -> DataFrame:
+def load_lookup_dataset(spark: SparkSession, input_file_path: str = INPUT_FILE_2_PATH) -> DataFrame:
+    """
+    Loads the second input CSV file, i.e. the counterparty to tier lookup.
+    :param spark: the spark session
+    :param input_file_path: the path to the CSV file containing the second dataset
+    :return: the loaded dataframe
+    """
+    # Can define schemas explicitly and pass them in via .schema(schema) instead of inferring
+    return spark.read.csv(input_file_path, header='true', inferSchema=True)
+
+
+def load_main_dataset(spark: SparkSession, input_file_path: str = INPUT_FILE_1_PATH,
+                      df_2: Optional[DataFrame] = None) -> DataFrame:
     """
     Loads the two input CSV files and joins them into a single dataframe.
     :param spark: the spark session
+    :param input_file_path: the path to the CSV file containing the first dataset
+    :param df_2: the already loaded second dataset, if any; loaded from INPUT_FILE_2_PATH otherwise
     :return: the joined dataframe
     """
     # Can define schemas explicitly and pass them in via .schema(schema) instead of inferring
-    df_1 = spark.read.csv(INPUT_FILE_1_PATH, header='true', inferSchema=True)
-    df_2 = spark.read.csv(INPUT_FILE_2_PATH, header='true', inferSchema=True)
+    df_1 = spark.read.csv(input_file_path, header='true', inferSchema=True)
+    if df_2 is None:
+        df_2 = load_lookup_dataset(spark)
+
+    return join_lookup(df_1, df_2)
+
+
+def join_lookup(df_1: DataFrame, df_2: DataFrame, partition_cols: Optional[List[str]] = None) -> DataFrame:
+    """
+    Joins the first dataset to the second one, i.e. adds the tier to each invoice.
+    :param df_1: the loaded first dataset
+    :param df_2: the loaded second dataset
+    :param partition_cols: the extra columns of the first dataset, if any, to keep, e.g. the scenario ID
+    :return: the joined dataframe
+    """
+    partition_cols = partition_cols or []
 
     df_main = (
         df_1
             .join(df_2, df_1[COL_COUNTER_PARTY] == df_2[COL_COUNTER_PARTY], how="inner")
             .drop(df_1[COL_INVOICE_ID])
             .drop(df_1[COL_COUNTER_PARTY])
-            .select(COL_LEGAL_ENTITY, COL_COUNTER_PARTY, COL_RATING, COL_STATUS, COL_VALUE, COL_TIER)
+            .select(*partition_cols, COL_LEGAL_ENTITY, COL_COUNTER_PARTY, COL_RATING, COL_STATUS, COL_VALUE, COL_TIER)
     )
     return df_main
 
 
-def compute_max_rating_by_counterparty(df_keys: DataFrame, df_main) -> DataFrame:
+def join_condition(df_left: DataFrame, df_right: DataFrame, prefix: str, cols: List[str]) -> Column:
+    """
+    Builds the condition for joining on the given columns, which are renamed with the prefix on the right side.
+    :param df_left: the left dataframe
+    :param df_right: the right dataframe
+    :param prefix: the prefix of the renamed columns of the right dataframe
+    :param cols: the columns to join on
+    :return: the join condition
+    """
+    return reduce(lambda a, b: a & b, [df_left[c] == df_right[f"{prefix}_{c}"] for c in cols])
+
+
+def compute_max_rating_by_counterparty(df_keys: DataFrame, df_main,
+                                       partition_cols: Optional[List[str]] = None) -> DataFrame:
     """
     Computes the maximum rating by { legal entity, counterparty }.
     :param df_keys: the dataframe which contains all the 'keys' where each key is a tuple of
     { legal entity, counterparty, tier } where the tier doesn't vary and is tied to the entity/counterparty
     :param df_main: the main loaded input dataset
+    :param partition_cols: the columns, if any, to compute the results separately for each value of
     :return: the dataframe with the 'keys' and the computed max rating by counterparty column
     """
+    partition_cols = partition_cols or []
+
     df_rating = (
         df_main
-            .groupBy([COL_LEGAL_ENTITY, COL_COUNTER_PARTY, COL_TIER])
+            .groupBy(partition_cols + [COL_LEGAL_ENTITY, COL_COUNTER_PARTY, COL_TIER])
             .agg(smax(COL_RATING).alias(COL_MAX_RATING_BY_COUNTERPARTY))
             .withColumnRenamed(COL_LEGAL_ENTITY, f"rtg_{COL_LEGAL_ENTITY}")
             .withColumnRenamed(COL_COUNTER_PARTY, f"rtg_{COL_COUNTER_PARTY}")
             .withColumnRenamed(COL_TIER, f"rtg_{COL_TIER}")
             .orderBy([COL_LEGAL_ENTITY, COL_COUNTER_PARTY, COL_TIER])
     )
+    for partition_col in partition_cols:
+        df_rating = df_rating.withColumnRenamed(partition_col, f"rtg_{partition_col}")
 
     df_result = (
         df_keys
-            .join(df_rating, (df_keys[COL_LEGAL_ENTITY] == df_rating[f"rtg_{COL_LEGAL_ENTITY}"]) & (
-                df_keys[COL_COUNTER_PARTY] == df_rating[f"rtg_{COL_COUNTER_PARTY}"]), how="inner")
-            .select(COL_LEGAL_ENTITY, COL_COUNTER_PARTY, COL_TIER, COL_MAX_RATING_BY_COUNTERPARTY)
+            .join(df_rating, join_condition(df_keys, df_rating, "rtg",
+                                            partition_cols + [COL_LEGAL_ENTITY, COL_COUNTER_PARTY]), how="inner")
+            .select(*partition_cols, COL_LEGAL_ENTITY, COL_COUNTER_PARTY, COL_TIER, COL_MAX_RATING_BY_COUNTERPARTY)
     )
     return df_result
 
 
-def compute_accr_value_sums(df_main: DataFrame, df_result: DataFrame) -> DataFrame:
+def compute_accr_value_sums(df_main: DataFrame, df_result: DataFrame,
+                            partition_cols: Optional[List[str]] = None) -> DataFrame:
     """
     Computes the value sums for the rows in the input dataframe where status value=ACCR.
     :param df_main: the main loaded input dataframe
     :param df_result: the result of the overall transformation, to be updated in this method
+    :param partition_cols: the columns, if any, to compute the results separately for each value of
     :return: the updated result with the value sums in the added ACCR value sums column
     """
+    partition_cols = partition_cols or []
+
     # Compute the value sums
     df_accr_sums = (
         df_main
             .filter(col(COL_STATUS) == lit(STATUS_ACCR))
-            .groupBy([COL_LEGAL_ENTITY, COL_COUNTER_PARTY, COL_TIER])
+            .groupBy(partition_cols + [COL_LEGAL_ENTITY, COL_COUNTER_PARTY, COL_TIER])
             .agg(ssum(COL_VALUE).alias(COL_ACCR_VALUE_SUMS))
             .withColumnRenamed(COL_LEGAL_ENTITY, f"accr_{COL_LEGAL_ENTITY}")
             .withColumnRenamed(COL_COUNTER_PARTY, f"accr_{COL_COUNTER_PARTY}")
             .withColumnRenamed(COL_TIER, f"accr_{COL_TIER}")
     )
+    for partition_col in partition_cols:
+        df_accr_sums = df_accr_sums.withColumnRenamed(partition_col, f"accr_{partition_col}")
 
     # Add the value sums as a new column to the result. Fill the N/A's in the ACCR value sums column with 0.
     # (The rows with status value of ARAP will have 0).
     df_result = (
         df_result
-            .join(df_accr_sums, (df_result[COL_LEGAL_ENTITY] == df_accr_sums[f"accr_{COL_LEGAL_ENTITY}"]) & (
-                df_result[COL_COUNTER_PARTY] == df_accr_sums[f"accr_{COL_COUNTER_PARTY}"]), how="left_outer")
+            .join(df_accr_sums, join_condition(df_result, df_accr_sums, "accr",
+                                               partition_cols + [COL_LEGAL_ENTITY, COL_COUNTER_PARTY]), how="left_outer")
             .fillna(0, COL_ACCR_VALUE_SUMS)
-            .select(COL_LEGAL_ENTITY, COL_COUNTER_PARTY, COL_TIER, COL_MAX_RATING_BY_COUNTERPARTY, COL_ACCR_VALUE_SUMS)
+            .select(*partition_cols, COL_LEGAL_ENTITY, COL_COUNTER_PARTY, COL_TIER, COL_MAX_RATING_BY_COUNTERPARTY,
+                    COL_ACCR_VALUE_SUMS)
     )
     return df_result
 
 
-def compute_arap_value_sums(df_main, df_result):
+def compute_arap_value_sums(df_main, df_result, partition_cols: Optional[List[str]] = None):
     """
     Computes the value sums for the rows in the input dataframe where status value=ARAP.
     :param df_main: the main loaded input dataframe
     :param df_result: the result of the overall transformation, to be updated in this method
+    :param partition_cols: the columns, if any, to compute the results separately for each value of
     :return: the updated result with the value sums in the added ARAP value sums column
     """
+    partition_cols = partition_cols or []
+
     # Compute the value sums
     df_arap_sums = (
         df_main
             .filter(col(COL_STATUS) == lit(STATUS_ARAP))
-            .groupBy([COL_LEGAL_ENTITY, COL_COUNTER_PARTY])
+            .groupBy(partition_cols + [COL_LEGAL_ENTITY, COL_COUNTER_PARTY])
             .agg(ssum(COL_VALUE).alias(COL_ARAP_VALUE_SUMS))
             .withColumnRenamed(COL_LEGAL_ENTITY, f"arap_{COL_LEGAL_ENTITY}")
             .withColumnRenamed(COL_COUNTER_PARTY, f"arap_{COL_COUNTER_PARTY}")
             .withColumnRenamed(COL_TIER, f"arap_{COL_TIER}")
     )
+    for partition_col in partition_cols:
+        df_arap_sums = df_arap_sums.withColumnRenamed(partition_col, f"arap_{partition_col}")
 
     # Add the value sums as a new column to the result. Fill the N/A's in the ARAP value sums column with 0.
     # (The rows with status value of ACCR will have 0).
     df_result = (
         df_result
-            .join(df_arap_sums, (df_result[COL_LEGAL_ENTITY] == df_arap_sums[f"arap_{COL_LEGAL_ENTITY}"]) & (
-                df_result[COL_COUNTER_PARTY] == df_arap_sums[f"arap_{COL_COUNTER_PARTY}"]), how="left_outer")
+            .join(df_arap_sums, join_condition(df_result, df_arap_sums, "arap",
+                                               partition_cols + [COL_LEGAL_ENTITY, COL_COUNTER_PARTY]), how="left_outer")
             .fillna(0, COL_ARAP_VALUE_SUMS)
-            .select(COL_LEGAL_ENTITY, COL_COUNTER_PARTY, COL_TIER, COL_MAX_RATING_BY_COUNTERPARTY, COL_ARAP_VALUE_SUMS,
+            .select(*partition_cols, COL_LEGAL_ENTITY, COL_COUNTER_PARTY, COL_TIER, COL_MAX_RATING_BY_COUNTERPARTY, COL_ARAP_VALUE_SUMS,
                     COL_ACCR_VALUE_SUMS)
     )
     return df_result
 
 
-def persist_results(df_result: DataFrame) -> None:
+def perform_transformations(df_main: DataFrame, partition_cols: Optional[List[str]] = None) -> DataFrame:
+    """
+    Performs the main transformation of the joined input dataset.
+    :param df_main: the main loaded input dataset
+    :param partition_cols: the columns, if any, to compute the results separately for each value of, e.g. the
+    scenario ID; they are kept as the leading columns of the results
+    :return: the resulting dataframe
+    """
+    partition_cols = partition_cols or []
+
+    df_keys = (
+        df_main
+            .select(*partition_cols, COL_LEGAL_ENTITY, COL_COUNTER_PARTY, COL_TIER)
+            .drop_duplicates()
+    )
+
+    df_result = compute_max_rating_by_counterparty(df_keys, df_main, partition_cols)
+
+    df_result = compute_accr_value_sums(df_main, df_result, partition_cols)
+
+    df_result = compute_arap_value_sums(df_main, df_result, partition_cols)
+
+    return df_result
+
+
+def persist_results(df_result: DataFrame, output_dir_path: str = OUTPUT_DIR_PATH,
+                    output_fname: str = OUTPUT_FNAME) -> None:
     """
     Persists the resulting DataFrame to a CSV file.
     :param df_result: the resulting dataframe
+    :param output_dir_path: the output directory
+    :param output_fname: the name of the output CSV file within the output directory
     :return: none
     """
     # Coalesce the results into a single CSV file.
     # Include the header row.
     # Overwrite if the previously generated output exists.
     df_result.coalesce(1).orderBy([COL_LEGAL_ENTITY, COL_COUNTER_PARTY]).write.option("header", True).mode(
-        "overwrite").csv(OUTPUT_DIR_PATH)
+        "overwrite").csv(output_dir_path)
 
     # Delete any .crc files generated alongside the CSV
-    remove_files_in_dir(OUTPUT_DIR_PATH, ".crc")
+    remove_files_in_dir(output_dir_path, ".crc")
 
     # Rename the output file to the specific name
-    output_fname = find_first_file_with_ext(OUTPUT_DIR_PATH, ".csv")
-    rename_file(OUTPUT_DIR_PATH, output_fname, OUTPUT_FNAME)
+    generated_fname = find_first_file_with_ext(output_dir_path, ".csv")
+    rename_file(output_dir_path, generated_fname, output_fname)
 
 
 def main() -> None:
@@ -184,17 +283,7 @@ def main() -> None:
 
     df_main = load_main_dataset(spark)
 
-    df_keys = (
-        df_main
-            .select(COL_LEGAL_ENTITY, COL_COUNTER_PARTY, COL_TIER)
-            .drop_duplicates()
-    )
-
-    df_result = compute_max_rating_by_counterparty(df_keys, df_main)
-
-    df_result = compute_accr_value_sums(df_main, df_result)
-
-    df_result = compute_arap_value_sums(df_main, df_result)
+    df_result = perform_transformations(df_main)
 
     persist_results(df_result)
 
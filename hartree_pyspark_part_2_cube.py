@@ -1,5 +1,5 @@
 import os
-from typing import List
+from typing import List, Optional
 
 from pyspark.sql import DataFrame, SparkSession
 from pyspark.sql.functions import (
@@ -32,6 +32,8 @@ COLS_TO_CUBE = [
     COL_ACCR_VALUE_SUMS,
 ]
 
+CUBE_INPUT_VIEW = "cube_input"
+
 OUTPUT_DIR_PATH = "pyspark_results_cube"
 OUTPUT_FNAME = "part_1_result_cube_pyspark.csv"
 
@@ -48,8 +50,27 @@ def load_input_dataset(spark: SparkSession) -> DataFrame:
     return spark.read.csv(INPUT_FILE_PATH, header='true', inferSchema=True)
 
 
-def generate_cube(df: DataFrame, cols: List[str]) -> DataFrame:
-    df_cube = df.cube(cols).count().drop("count")
+def generate_cube(df: DataFrame, cols: List[str], partition_cols: Optional[List[str]] = None) -> DataFrame:
+    """
+    Generates the cube for the given columns.
+    :param df: the input dataframe (the output of hartree_pyspark_part_1_main)
+    :param cols: the columns to cube
+    :param partition_cols: the columns, if any, to compute a separate cube for each value of, e.g. the scenario ID
+    :return: the cube dataframe
+    """
+    partition_cols = partition_cols or []
+
+    if partition_cols:
+        # GROUP BY <partition columns>, CUBE(<columns>) computes only the grouping sets that keep the partition
+        # columns, whereas cubing them as well would double the grouping sets only to filter the extra ones out.
+        df.createOrReplaceTempView(CUBE_INPUT_VIEW)
+        select_cols = ", ".join(f"`{c}`" for c in partition_cols + cols)
+        partition_group_cols = ", ".join(f"`{c}`" for c in partition_cols)
+        cube_cols = ", ".join(f"`{c}`" for c in cols)
+        df_cube = df.sparkSession.sql(
+            f"SELECT {select_cols} FROM {CUBE_INPUT_VIEW} GROUP BY {partition_group_cols}, CUBE({cube_cols})")
+    else:
+        df_cube = df.cube(cols).count().drop("count")
 
     df_cube = df_cube.filter(col(COL_TIER).isNotNull())
 
@@ -59,7 +80,7 @@ def generate_cube(df: DataFrame, cols: List[str]) -> DataFrame:
 
     df_cube = (
         df_cube
-            .groupby([COL_LEGAL_ENTITY, COL_COUNTER_PARTY, COL_TIER])
+            .groupby(partition_cols + [COL_LEGAL_ENTITY, COL_COUNTER_PARTY, COL_TIER])
             .agg(
             smax(COL_MAX_RATING_BY_COUNTERPARTY).alias(COL_MAX_RATING_BY_COUNTERPARTY),
             smax(COL_ARAP_VALUE_SUMS).alias(COL_ARAP_VALUE_SUMS),
@@ -72,24 +93,27 @@ def generate_cube(df: DataFrame, cols: List[str]) -> DataFrame:
     return df_cube
 
 
-def persist_results(df_result: DataFrame) -> None:
+def persist_results(df_result: DataFrame, output_dir_path: str = OUTPUT_DIR_PATH,
+                    output_fname: str = OUTPUT_FNAME) -> None:
     """
     Persists the resulting DataFrame to a CSV file.
     :param df_result: the resulting dataframe
+    :param output_dir_path: the output directory
+    :param output_fname: the name of the output CSV file within the output directory
     :return: none
     """
     # Coalesce the results into a single CSV file.
     # Include the header row.
     # Overwrite if the previously generated output exists.
     df_result.coalesce(1).orderBy([COL_LEGAL_ENTITY, COL_COUNTER_PARTY, COL_TIER]).write.option("header", True).mode(
-        "overwrite").csv(OUTPUT_DIR_PATH)
+        "overwrite").csv(output_dir_path)
 
     # Delete any .crc files generated alongside the CSV
-    remove_files_in_dir(OUTPUT_DIR_PATH, ".crc")
+    remove_files_in_dir(output_dir_path, ".crc")
 
     # Rename the output file to the specific name
-    output_fname = find_first_file_with_ext(OUTPUT_DIR_PATH, ".csv")
-    rename_file(OUTPUT_DIR_PATH, output_fname, OUTPUT_FNAME)
+    generated_fname = find_first_file_with_ext(output_dir_path, ".csv")
+    rename_file(output_dir_path, generated_fname, output_fname)
 
 
 def main() -> None:
@@ -0,0 +1,245 @@
+import math
+from typing import Any, Dict, Optional
+
+import numpy as np
+from pandas.core.series import Series
+
+QUANTILE_RELATIVE_ACCURACY = 0.01
+Z_95 = 1.96
+
+
+class QuantileSketch:
+    """
+    Quantile sketch with relative accuracy guarantees on the returned values (DDSketch-style log-spaced buckets).
+    Two sketches with the same accuracy merge by adding up their bucket counts. The values can be weighted, e.g. by
+    the inverse of their sampling probability, in which case the counts are the weighted ones.
+    """
+
+    def __init__(self, relative_accuracy: float = QUANTILE_RELATIVE_ACCURACY):
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self.positive: Dict[int, float] = {}
+        self.negative: Dict[int, float] = {}
+        self.zeros = 0.0
+
+    @property
+    def count(self) -> float:
+        return self.zeros + sum(self.positive.values()) + sum(self.negative.values())
+
+    def _add_to_store(self, store: Dict[int, float], values: np.ndarray, weights: np.ndarray) -> None:
+        if len(values) == 0:
+            return
+        buckets, inverse = np.unique(np.ceil(np.log(values) / math.log(self.gamma)).astype(np.int64),
+                                     return_inverse=True)
+        counts = np.bincount(inverse, weights=weights)
+        for bucket, count in zip(buckets.tolist(), counts.tolist()):
+            store[bucket] = store.get(bucket, 0) + count
+
+    def update(self, values: Series, weights: Optional[Series] = None) -> "QuantileSketch":
+        """
+        Adds the values to the sketch.
+        :param values: the values
+        :param weights: the weights of the values, if any; 1 each otherwise
+        :return: the sketch itself
+        """
+        arr = values.to_numpy(dtype=np.float64)
+        w = np.ones(len(arr)) if weights is None else weights.to_numpy(dtype=np.float64)
+        self._add_to_store(self.positive, arr[arr > 0], w[arr > 0])
+        self._add_to_store(self.negative, -arr[arr < 0], w[arr < 0])
+        self.zeros += float(np.sum(w[arr == 0]))
+        return self
+
+    def merge(self, other: "QuantileSketch") -> "QuantileSketch":
+        """
+        Merges the two sketches into a new one.
+        :param other: the other sketch; must be of the same relative accuracy
+        :return: the merged sketch
+        """
+        if other.relative_accuracy != self.relative_accuracy:
+            raise ValueError("Cannot merge quantile sketches of different relative accuracy")
+        result = QuantileSketch(self.relative_accuracy)
+        for store, this_store, other_store in ((result.positive, self.positive, other.positive),
+                                               (result.negative, self.negative, other.negative)):
+            store.update(this_store)
+            for bucket, count in other_store.items():
+                store[bucket] = store.get(bucket, 0) + count
+        result.zeros = self.zeros + other.zeros
+        return result
+
+    def to_dict(self) -> Dict[str, Any]:
+        # JSON object keys are strings, hence the bucket indexes are converted
+        return {
+            "relative_accuracy": self.relative_accuracy,
+            "positive": {str(bucket): count for bucket, count in self.positive.items()},
+            "negative": {str(bucket): count for bucket, count in self.negative.items()},
+            "zeros": self.zeros,
+        }
+
+    @classmethod
+    def from_dict(cls, state: Dict[str, Any]) -> "QuantileSketch":
+        result = cls(state["relative_accuracy"])
+        result.positive = {int(bucket): count for bucket, count in state["positive"].items()}
+        result.negative = {int(bucket): count for bucket, count in state["negative"].items()}
+        result.zeros = state["zeros"]
+        return result
+
+    def _bucket_value(self, bucket: int) -> float:
+        return 2 * self.gamma ** bucket / (self.gamma + 1)
+
+    def quantile(self, q: float) -> float:
+        """
+        Estimates the q-th quantile of the values added to the sketch.
+        :param q: the quantile, between 0 and 1
+        :return: the estimate, or NaN if the sketch is empty
+        """
+        total = self.count
+        if total == 0:
+            return float("nan")
+        rank = q * (total - 1)
+        seen = 0
+        for bucket in sorted(self.negative, reverse=True):
+            seen += self.negative[bucket]
+            if seen > rank:
+                return -self._bucket_value(bucket)
+        seen += self.zeros
+        if seen > rank:
+            return 0.0
+        for bucket in sorted(self.positive):
+            seen += self.positive[bucket]
+            if seen > rank:
+                return self._bucket_value(bucket)
+        return self._bucket_value(max(self.positive))
+
+
+class SampledSum:
+    """
+    A sum estimated from a stratified block sample (see SampleDesign), kept as the sampled block totals of the summed
+    rows. Only the blocks which have any of the summed rows are kept; the other sampled blocks total 0. The sums over
+    different cells share the sampled blocks, so the variance of their total is not the total of their variances;
+    keeping the block totals lets it be computed from the merged block totals instead. Two sums, e.g. over two cells
+    or over two shards, merge by adding up their block totals.
+    """
+
+    def __init__(self, block_totals: Optional[Dict[str, float]] = None):
+        self.block_totals: Dict[str, float] = block_totals or {}
+
+    @classmethod
+    def from_sample(cls, block_totals: Series) -> "SampledSum":
+        """
+        Builds the sum from the totals of the sampled rows per block.
+        :param block_totals: the block totals, indexed by the block key
+        :return: the sum
+        """
+        return cls({str(block): float(total) for block, total in block_totals.items()})
+
+    @property
+    def sample_blocks(self) -> int:
+        return len(self.block_totals)
+
+    @property
+    def sample_total(self) -> float:
+        return sum(self.block_totals.values())
+
+    def merge(self, other: "SampledSum") -> "SampledSum":
+        block_totals = dict(self.block_totals)
+        for block, total in other.block_totals.items():
+            block_totals[block] = block_totals.get(block, 0.0) + total
+        return SampledSum(block_totals)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"block_totals": self.block_totals}
+
+    @classmethod
+    def from_dict(cls, state: Dict[str, Any]) -> "SampledSum":
+        return cls(state["block_totals"])
+
+
+class SampleDesign:
+    """
+    Stratified block sample: the input is split into blocks, the blocks into strata of adjacent blocks, and a few
+    blocks of each stratum are sampled without replacement. Sums are estimated by the Horvitz-Thompson estimator,
+    weighting each sampled block by N_h / n_h, with the variance estimated from the spread of the sampled block totals
+    within each stratum. As long as at least two blocks of each stratum are sampled (or all of them), the variance
+    estimate is unbiased. The strata and blocks of each shard are keyed by the shard ID, so the designs of separate
+    shards, even sampled at different rates, merge into one.
+    """
+
+    def __init__(self, strata: Optional[Dict[str, int]] = None, blocks: Optional[Dict[str, str]] = None):
+        """
+        :param strata: the number of blocks N_h of each stratum, by the stratum key
+        :param blocks: the stratum key of each sampled block, by the block key
+        """
+        self.strata: Dict[str, int] = strata or {}
+        self.blocks: Dict[str, str] = blocks or {}
+
+        stratum_index = {stratum: i for i, stratum in enumerate(self.strata)}
+        self._block_index = {block: i for i, block in enumerate(self.blocks)}
+        self._block_strata = np.array([stratum_index[stratum] for stratum in self.blocks.values()], dtype=np.int64)
+        self._stratum_sizes = np.array(list(self.strata.values()), dtype=np.float64)
+        self._stratum_samples = np.bincount(self._block_strata, minlength=len(self.strata)).astype(np.float64)
+
+    @property
+    def is_complete(self) -> bool:
+        return bool(np.all(self._stratum_samples == self._stratum_sizes))
+
+    @property
+    def sample_fraction(self) -> float:
+        return len(self.blocks) / max(sum(self.strata.values()), 1)
+
+    def block_weights(self, blocks: Series) -> Series:
+        """
+        Looks up the sampling weights N_h / n_h of the given sampled blocks.
+        :param blocks: the block keys
+        :return: the weights
+        """
+        weights = (self._stratum_sizes / self._stratum_samples)[self._block_strata]
+        return blocks.map(dict(zip(self.blocks, weights.tolist())))
+
+    def _sampled_totals(self, sampled_sum: SampledSum) -> np.ndarray:
+        y = np.zeros(len(self.blocks))
+        for block, total in sampled_sum.block_totals.items():
+            y[self._block_index[block]] = total
+        return y
+
+    def estimate(self, sampled_sum: SampledSum) -> float:
+        y = self._sampled_totals(sampled_sum)
+        return float(np.sum(y * (self._stratum_sizes / self._stratum_samples)[self._block_strata]))
+
+    def variance(self, sampled_sum: SampledSum) -> float:
+        y = self._sampled_totals(sampled_sum)
+        n = self._stratum_samples
+        big_n = self._stratum_sizes
+        means = np.bincount(self._block_strata, weights=y, minlength=len(n)) / n
+        squares = np.bincount(self._block_strata, weights=(y - means[self._block_strata]) ** 2, minlength=len(n))
+        # A stratum with a single block sampled is a fully sampled one, hence contributes nothing.
+        s2 = np.divide(squares, n - 1, out=np.zeros(len(n)), where=n > 1)
+        return float(np.sum(big_n * big_n * (1 - n / big_n) * s2 / n))
+
+    def error(self, sampled_sum: SampledSum, z: float = Z_95) -> float:
+        """
+        Computes the half-width of the confidence interval around the estimate of the sum.
+        :param sampled_sum: the sum
+        :param z: the z-score of the confidence level; 95% by default
+        :return: the error bound, or NaN if none of the summed rows were sampled out of an incomplete sample, in which
+        case the sample tells nothing about how far off the estimate of 0 is
+        """
+        if sampled_sum.sample_blocks == 0 and not self.is_complete:
+            return float("nan")
+        return z * math.sqrt(self.variance(sampled_sum))
+
+    def merge(self, other: "SampleDesign") -> "SampleDesign":
+        """
+        Merges the designs of two separate shards.
+        :param other: the other design
+        :return: the merged design
+        """
+        if set(self.strata) & set(other.strata):
+            raise ValueError("Cannot merge the sample designs of overlapping shards")
+        return SampleDesign({**self.strata, **other.strata}, {**self.blocks, **other.blocks})
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"strata": self.strata, "blocks": self.blocks}
+
+    @classmethod
+    def from_dict(cls, state: Dict[str, Any]) -> "SampleDesign":
+        return cls(state["strata"], state["blocks"])